@@ -8,9 +8,32 @@ from typing import List, Dict, Any, Optional
 from dataclasses import asdict
 from flask import Flask, jsonify, request, send_file
 from flask_cors import CORS
-import requests
 from run_registry import RunRegistry, RunConfig
 
+# Required CSV columns based on schema, in output order
+REQUIRED_CSV_COLUMNS = [
+    'run_id',
+    'timestamp',
+    'model',
+    'vae',
+    'prompt',
+    'negative_prompt',
+    'seed',
+    'sampler',
+    'steps',
+    'cfg_scale',
+    'width',
+    'height',
+    'batch_size',
+    'batch_count',
+    'generation_type',
+    'image_paths',
+    'loras',
+    'controlnets',
+    'workflow_hash'
+]
+_REQUIRED_CSV_COLUMN_SET = frozenset(REQUIRED_CSV_COLUMNS)
+
 class ReportBundleGenerator:
     """Generates report bundles with CSV, config, images, and README"""
     
@@ -22,31 +45,8 @@ class ReportBundleGenerator:
         """Generate results.csv with required columns"""
         csv_path = "temp_results.csv"
         
-        # Define required CSV columns based on schema
-        required_columns = [
-            'run_id',
-            'timestamp', 
-            'model',
-            'vae',
-            'prompt',
-            'negative_prompt',
-            'seed',
-            'sampler',
-            'steps',
-            'cfg_scale',
-            'width',
-            'height',
-            'batch_size',
-            'batch_count',
-            'generation_type',
-            'image_paths',
-            'loras',
-            'controlnets',
-            'workflow_hash'
-        ]
-        
         with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=required_columns)
+            writer = csv.DictWriter(csvfile, fieldnames=REQUIRED_CSV_COLUMNS)
             writer.writeheader()
             
             for run in runs:
@@ -89,19 +89,12 @@ class ReportBundleGenerator:
         """Validate that CSV has all required columns"""
         try:
             with open(csv_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                fieldnames = reader.fieldnames
-                
-                required_columns = [
-                    'run_id', 'timestamp', 'model', 'vae', 'prompt', 
-                    'negative_prompt', 'seed', 'sampler', 'steps', 'cfg_scale',
-                    'width', 'height', 'batch_size', 'batch_count', 
-                    'generation_type', 'image_paths', 'loras', 'controlnets', 'workflow_hash'
-                ]
+                # Only the header row matters for schema validation
+                fieldnames = next(csv.reader(csvfile), ())
                 
-                missing_columns = [col for col in required_columns if col not in fieldnames]
+                missing_columns = _REQUIRED_CSV_COLUMN_SET.difference(fieldnames)
                 if missing_columns:
-                    print(f"❌ Missing required columns: {missing_columns}")
+                    print(f"❌ Missing required columns: {[c for c in REQUIRED_CSV_COLUMNS if c in missing_columns]}")
                     return False
                 
                 print(f"✅ CSV schema validation passed")
@@ -137,9 +130,9 @@ class ReportBundleGenerator:
         
         return copied_images
     
-    def create_config_json(self, runs: List[RunConfig]) -> str:
-        """Create config.json with run configurations"""
-        config_data = {
+    def build_config_dict(self, runs: List[RunConfig]) -> Dict[str, Any]:
+        """Build the config.json contents for the given runs"""
+        return {
             "report_metadata": {
                 "generated_at": datetime.now().isoformat(),
                 "total_runs": len(runs),
@@ -148,6 +141,10 @@ class ReportBundleGenerator:
             },
             "runs": [asdict(run) for run in runs]
         }
+    
+    def create_config_json(self, runs: List[RunConfig]) -> str:
+        """Create config.json with run configurations"""
+        config_data = self.build_config_dict(runs)
         
         config_path = "temp_config.json"
         with open(config_path, 'w', encoding='utf-8') as f:
@@ -206,8 +203,23 @@ All image paths in the CSV resolve to files present in this zip bundle.
         
         return readme_path
     
-    def create_report_bundle(self, run_ids: Optional[List[str]] = None) -> str:
-        """Create a complete report bundle"""
+    def pack_zip(self, bundle_dir: str, zip_path: str, compression: int = zipfile.ZIP_DEFLATED) -> str:
+        """Pack the contents of a bundle directory into a zip file"""
+        with zipfile.ZipFile(zip_path, 'w', compression) as zipf:
+            for root, dirs, files in os.walk(bundle_dir):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    arcname = os.path.relpath(file_path, bundle_dir)
+                    zipf.write(file_path, arcname)
+        
+        return zip_path
+    
+    def create_report_bundle(
+        self,
+        run_ids: Optional[List[str]] = None,
+        compression: int = zipfile.ZIP_DEFLATED
+    ) -> str:
+        """Create a complete report bundle, zipped with the given compression method"""
         
         # Get runs to include
         if run_ids:
@@ -252,13 +264,7 @@ All image paths in the CSV resolve to files present in this zip bundle.
             
             # Create zip file
             print("📦 Creating report.zip...")
-            zip_path = "report.zip"
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(bundle_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, bundle_dir)
-                        zipf.write(file_path, arcname)
+            zip_path = self.pack_zip(bundle_dir, "report.zip", compression)
             
             # Cleanup temp files
             for temp_file in [csv_path, config_path, readme_path]:
@@ -4,6 +4,7 @@ import time
 import uuid
 from datetime import datetime
 from typing import Dict, List, Any, Optional
+from contextlib import contextmanager
 from dataclasses import dataclass, asdict
 from flask import Flask, jsonify, request
 from flask_cors import CORS
@@ -38,6 +39,8 @@ class RunRegistry:
     def __init__(self, storage_file: str = "run_registry.json"):
         self.storage_file = storage_file
         self.runs: Dict[str, RunConfig] = {}
+        self._bulk_depth = 0
+        self._dirty = False
         self.load_runs()
     
     def load_runs(self):
@@ -60,10 +63,35 @@ class RunRegistry:
         except Exception as e:
             print(f"Error saving run registry: {e}")
     
+    def _persist(self):
+        """Save now, or defer the save while inside bulk_update()"""
+        if self._bulk_depth:
+            self._dirty = True
+        else:
+            self.save_runs()
+    
+    @contextmanager
+    def bulk_update(self):
+        """Defer saving until the outermost block exits, then save once"""
+        self._bulk_depth += 1
+        try:
+            yield self
+        finally:
+            self._bulk_depth -= 1
+            if not self._bulk_depth and self._dirty:
+                self._dirty = False
+                self.save_runs()
+    
     def add_run(self, config: RunConfig):
         """Add a completed run to the registry"""
         self.runs[config.run_id] = config
-        self.save_runs()
+        self._persist()
+    
+    def add_runs(self, configs: List[RunConfig]):
+        """Add several completed runs, saving the registry once"""
+        with self.bulk_update():
+            for config in configs:
+                self.add_run(config)
     
     def get_run(self, run_id: str) -> Optional[RunConfig]:
         """Get a specific run by ID"""
@@ -77,7 +105,7 @@ class RunRegistry:
         """Delete a run from the registry"""
         if run_id in self.runs:
             del self.runs[run_id]
-            self.save_runs()
+            self._persist()
             return True
         return False
 
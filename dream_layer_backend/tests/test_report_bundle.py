@@ -1,64 +1,101 @@
 import pytest
+import io
 import json
 import csv
-import tempfile
 import os
 import zipfile
+from collections import defaultdict
+from dataclasses import replace
 from datetime import datetime
+import report_bundle
 from report_bundle import ReportBundleGenerator, RunConfig
 
+# Fixed run timestamp so generated artifacts are reproducible
+_FIXED_TS = "2023-01-01T00:00:00"
+
+
+class _FrozenDatetime(datetime):
+    """datetime whose now() always returns _FIXED_TS"""
+    
+    @classmethod
+    def now(cls, tz=None):
+        return cls.fromisoformat(_FIXED_TS)
+
+
+# Columns every results.csv must contain
+REQUIRED_COLUMNS = frozenset({
+    'run_id', 'timestamp', 'model', 'vae', 'prompt',
+    'negative_prompt', 'seed', 'sampler', 'steps', 'cfg_scale',
+    'width', 'height', 'batch_size', 'batch_count',
+    'generation_type', 'image_paths', 'loras', 'controlnets', 'workflow_hash'
+})
+
+# Dummy image files present in the generator's output directory
+_TEST_IMAGES = ("test_image_0.png", "test_image_1.png", "test_image_2.png")
+_IMG_ONE = _TEST_IMAGES[:1]
+_IMG_REST = _TEST_IMAGES[1:]
+
+
+# Baseline run that individual tests override with dataclasses.replace
+_BASE_RUN = RunConfig(
+    run_id="test-run-1",
+    timestamp=_FIXED_TS,
+    model="test-model.safetensors",
+    vae=None,
+    loras=[],
+    controlnets=[],
+    prompt="test prompt",
+    negative_prompt="",
+    seed=12345,
+    sampler="euler",
+    steps=20,
+    cfg_scale=7.0,
+    width=512,
+    height=512,
+    batch_size=1,
+    batch_count=1,
+    workflow={},
+    version="1.0.0",
+    generated_images=_IMG_ONE,
+    generation_type="txt2img"
+)
+
+
+@pytest.fixture(scope="session")
+def test_image_dir(tmp_path_factory):
+    """Output directory holding the dummy test images, written once per session"""
+    image_dir = tmp_path_factory.mktemp("bundle")
+    for i, image_name in enumerate(_TEST_IMAGES):
+        with open(image_dir / image_name, 'wb', buffering=0) as f:
+            f.write(b"fake image data %d" % i)
+    return image_dir
+
+
+@pytest.fixture(scope="class")
+def shared_generator(test_image_dir):
+    """Report bundle generator shared across the class"""
+    return ReportBundleGenerator(str(test_image_dir))
+
+
 class TestReportBundle:
     """Test cases for the Report Bundle functionality"""
     
-    def setup_method(self):
-        """Set up test fixtures"""
-        # Create temporary directories for testing
-        self.temp_output_dir = tempfile.mkdtemp()
-        self.generator = ReportBundleGenerator(self.temp_output_dir)
-        
-        # Create test images
-        self.test_images = []
-        for i in range(3):
-            image_path = os.path.join(self.temp_output_dir, f"test_image_{i}.png")
-            with open(image_path, 'w') as f:
-                f.write(f"fake image data {i}")
-            self.test_images.append(f"test_image_{i}.png")
-    
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        import shutil
-        if os.path.exists(self.temp_output_dir):
-            shutil.rmtree(self.temp_output_dir)
+    @pytest.fixture(autouse=True)
+    def _reset_generator(self, shared_generator, tmp_path, monkeypatch):
+        """Reset registry state and keep bundle outputs under tmp_path"""
+        # The generator writes its temp files and report.zip to the cwd
+        monkeypatch.chdir(tmp_path)
+        self.generator = shared_generator
+        self.generator.registry.runs = {}
     
     def test_required_csv_columns_exist(self):
         """Test that CSV has all required columns"""
         # Create test runs
         test_runs = [
-            RunConfig(
-                run_id="test-run-1",
-                timestamp=datetime.now().isoformat(),
-                model="test-model.safetensors",
-                vae=None,
-                loras=[],
-                controlnets=[],
-                prompt="test prompt 1",
-                negative_prompt="test negative 1",
-                seed=12345,
-                sampler="euler",
-                steps=20,
-                cfg_scale=7.0,
-                width=512,
-                height=512,
-                batch_size=1,
-                batch_count=1,
-                workflow={},
-                version="1.0.0",
-                generated_images=self.test_images[:1],
-                generation_type="txt2img"
-            ),
-            RunConfig(
+            replace(_BASE_RUN, prompt="test prompt 1", negative_prompt="test negative 1"),
+            replace(
+                _BASE_RUN,
                 run_id="test-run-2",
-                timestamp=datetime.now().isoformat(),
                 model="test-model-2.safetensors",
                 vae="test-vae.safetensors",
                 loras=[{"name": "test-lora", "strength": 0.8}],
@@ -74,8 +111,7 @@ class TestReportBundle:
                 batch_size=2,
                 batch_count=3,
                 workflow={"test": "workflow"},
-                version="1.0.0",
-                generated_images=self.test_images[1:],
+                generated_images=_IMG_REST,
                 generation_type="img2img"
             )
         ]
@@ -88,22 +124,10 @@ class TestReportBundle:
         
         # Check that all required columns exist
         with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            fieldnames = reader.fieldnames
-            
-            required_columns = [
-                'run_id', 'timestamp', 'model', 'vae', 'prompt', 
-                'negative_prompt', 'seed', 'sampler', 'steps', 'cfg_scale',
-                'width', 'height', 'batch_size', 'batch_count', 
-                'generation_type', 'image_paths', 'loras', 'controlnets', 'workflow_hash'
-            ]
-            
-            for column in required_columns:
-                assert column in fieldnames, f"Missing required column: {column}"
+            fieldnames = next(csv.reader(f))
         
-        # Cleanup
-        if os.path.exists(csv_path):
-            os.remove(csv_path)
+        missing = REQUIRED_COLUMNS.difference(fieldnames)
+        assert not missing, f"Missing required columns: {sorted(missing)}"
     
     def test_empty_values_handled_without_crashes(self):
         """Test that empty values are handled without crashes"""
@@ -136,20 +160,15 @@ class TestReportBundle:
         
         # Should not crash when validating schema
         assert self.generator.validate_csv_schema(csv_path)
-        
-        # Cleanup
-        if os.path.exists(csv_path):
-            os.remove(csv_path)
     
-    def test_csv_schema_validation(self):
+    def test_csv_schema_validation(self, tmp_path):
         """Test CSV schema validation with valid and invalid schemas"""
         # Test valid CSV
         valid_csv_content = """run_id,timestamp,model,vae,prompt,negative_prompt,seed,sampler,steps,cfg_scale,width,height,batch_size,batch_count,generation_type,image_paths,loras,controlnets,workflow_hash
 test-run,2023-01-01T00:00:00,model.safetensors,vae.safetensors,prompt,negative,123,euler,20,7.0,512,512,1,1,txt2img,image.png,[],[],hash123"""
         
-        temp_csv = "temp_valid.csv"
-        with open(temp_csv, 'w', encoding='utf-8') as f:
-            f.write(valid_csv_content)
+        temp_csv = tmp_path / "valid.csv"
+        temp_csv.write_text(valid_csv_content, encoding='utf-8')
         
         assert self.generator.validate_csv_schema(temp_csv)
         
@@ -157,116 +176,76 @@ test-run,2023-01-01T00:00:00,model.safetensors,vae.safetensors,prompt,negative,1
         invalid_csv_content = """run_id,timestamp,model,prompt,seed
 test-run,2023-01-01T00:00:00,model.safetensors,prompt,123"""
         
-        temp_csv_invalid = "temp_invalid.csv"
-        with open(temp_csv_invalid, 'w', encoding='utf-8') as f:
-            f.write(invalid_csv_content)
+        temp_csv_invalid = tmp_path / "invalid.csv"
+        temp_csv_invalid.write_text(invalid_csv_content, encoding='utf-8')
         
         assert not self.generator.validate_csv_schema(temp_csv_invalid)
-        
-        # Cleanup
-        for temp_file in [temp_csv, temp_csv_invalid]:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
     
     def test_image_paths_resolve_to_files(self):
         """Test that all image paths in CSV resolve to files present in zip"""
         # Create test runs with images
-        test_runs = [
-            RunConfig(
-                run_id="test-run-1",
-                timestamp=datetime.now().isoformat(),
-                model="test-model.safetensors",
-                vae=None,
-                loras=[],
-                controlnets=[],
-                prompt="test prompt",
-                negative_prompt="",
-                seed=12345,
-                sampler="euler",
-                steps=20,
-                cfg_scale=7.0,
-                width=512,
-                height=512,
-                batch_size=1,
-                batch_count=1,
-                workflow={},
-                version="1.0.0",
-                generated_images=self.test_images,
-                generation_type="txt2img"
-            )
-        ]
+        test_runs = [replace(_BASE_RUN, generated_images=_TEST_IMAGES)]
         
         # Mock the registry to return our test runs
         self.generator.registry.runs = {run.run_id: run for run in test_runs}
         
         # Create report bundle
-        zip_path = self.generator.create_report_bundle([test_run.run_id for test_run in test_runs])
+        # Store entries uncompressed; the tests only inspect bundle contents
+        zip_path = self.generator.create_report_bundle(
+            [test_run.run_id for test_run in test_runs], compression=zipfile.ZIP_STORED
+        )
         
         # Verify zip file exists
         assert os.path.exists(zip_path)
         
         # Extract and verify contents
         with zipfile.ZipFile(zip_path, 'r') as zipf:
+            names = set(zipf.namelist())
+            
+            # Bin bundle entries by file name in a single pass
+            files_by_name = defaultdict(list)
+            for name in names:
+                files_by_name[name.rsplit('/', 1)[-1]].append(name)
+            
             # Check that results.csv exists
-            csv_files = [f for f in zipf.namelist() if f.endswith('results.csv')]
+            csv_files = files_by_name['results.csv']
             assert len(csv_files) == 1
             
             # Read CSV and verify image paths
-            with zipf.open(csv_files[0]) as csv_file:
-                reader = csv.DictReader(csv_file.read().decode('utf-8').splitlines())
+            with io.TextIOWrapper(zipf.open(csv_files[0]), encoding='utf-8', newline='') as csv_file:
+                reader = csv.reader(csv_file)
+                image_paths_idx = next(reader).index('image_paths')
                 for row in reader:
-                    image_paths = row['image_paths'].split(';') if row['image_paths'] else []
+                    image_paths = row[image_paths_idx].split(';') if row[image_paths_idx] else []
                     for image_path in image_paths:
                         if image_path.strip():
                             # Check that image exists in zip
                             image_in_zip = f"images/{image_path}"
-                            assert image_in_zip in zipf.namelist(), f"Image {image_path} not found in zip"
+                            assert image_in_zip in names, f"Image {image_path} not found in zip"
             
             # Check that config.json exists
-            config_files = [f for f in zipf.namelist() if f.endswith('config.json')]
+            config_files = files_by_name['config.json']
             assert len(config_files) == 1
             
             # Check that README.md exists
-            readme_files = [f for f in zipf.namelist() if f.endswith('README.md')]
+            readme_files = files_by_name['README.md']
             assert len(readme_files) == 1
-        
-        # Cleanup
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
     
-    def test_deterministic_file_names_and_paths(self):
-        """Test that file names and paths are deterministic"""
-        test_runs = [
-            RunConfig(
-                run_id="test-run-1",
-                timestamp=datetime.now().isoformat(),
-                model="test-model.safetensors",
-                vae=None,
-                loras=[],
-                controlnets=[],
-                prompt="test prompt",
-                negative_prompt="",
-                seed=12345,
-                sampler="euler",
-                steps=20,
-                cfg_scale=7.0,
-                width=512,
-                height=512,
-                batch_size=1,
-                batch_count=1,
-                workflow={},
-                version="1.0.0",
-                generated_images=self.test_images[:1],
-                generation_type="txt2img"
-            )
-        ]
+    def test_deterministic_file_names_and_paths(self, monkeypatch):
+        """Test that file names, paths and contents are deterministic"""
+        test_runs = [_BASE_RUN]
         
         # Mock the registry to return our test runs
         self.generator.registry.runs = {run.run_id: run for run in test_runs}
         
-        # Create two report bundles with same data
-        zip_path_1 = self.generator.create_report_bundle([test_runs[0].run_id])
-        zip_path_2 = self.generator.create_report_bundle([test_runs[0].run_id])
+        # Freeze the clock used for config.json and README.md timestamps
+        monkeypatch.setattr(report_bundle, "datetime", _FrozenDatetime)
+        
+        # Create two report bundles with same data; both are written to report.zip
+        zip_path_1 = self.generator.create_report_bundle([test_runs[0].run_id], compression=zipfile.ZIP_STORED)
+        os.replace(zip_path_1, "report_1.zip")
+        zip_path_1 = "report_1.zip"
+        zip_path_2 = self.generator.create_report_bundle([test_runs[0].run_id], compression=zipfile.ZIP_STORED)
         
         # Verify both zip files exist
         assert os.path.exists(zip_path_1)
@@ -280,55 +259,30 @@ test-run,2023-01-01T00:00:00,model.safetensors,prompt,123"""
             # Should have same files
             assert files_1 == files_2
             
+            # Should have same contents. Entry headers also carry file mtimes,
+            # so compare the CRCs recorded in the central directory rather
+            # than hashing the archives byte for byte.
+            crcs_1 = {info.filename: info.CRC for info in zip1.infolist()}
+            crcs_2 = {info.filename: info.CRC for info in zip2.infolist()}
+            assert crcs_1 == crcs_2
+            
             # Should have expected file structure
-            expected_files = [
+            expected_files = {
                 'results.csv',
-                'config.json', 
+                'config.json',
                 'README.md',
                 'images/test_image_0.png'
-            ]
+            }
             
-            for expected_file in expected_files:
-                assert any(f.endswith(expected_file) for f in files_1), f"Missing {expected_file}"
-        
-        # Cleanup
-        for zip_path in [zip_path_1, zip_path_2]:
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
+            missing = expected_files.difference(files_1)
+            assert not missing, f"Missing {sorted(missing)}"
     
     def test_config_json_structure(self):
         """Test that config.json has correct structure"""
-        test_runs = [
-            RunConfig(
-                run_id="test-run-1",
-                timestamp=datetime.now().isoformat(),
-                model="test-model.safetensors",
-                vae=None,
-                loras=[],
-                controlnets=[],
-                prompt="test prompt",
-                negative_prompt="",
-                seed=12345,
-                sampler="euler",
-                steps=20,
-                cfg_scale=7.0,
-                width=512,
-                height=512,
-                batch_size=1,
-                batch_count=1,
-                workflow={},
-                version="1.0.0",
-                generated_images=self.test_images[:1],
-                generation_type="txt2img"
-            )
-        ]
-        
-        # Create config.json
-        config_path = self.generator.create_config_json(test_runs)
+        test_runs = [_BASE_RUN]
         
-        # Verify structure
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
+        # Build config.json contents
+        config_data = self.generator.build_config_dict(test_runs)
         
         # Check required top-level keys
         assert 'report_metadata' in config_data
@@ -345,40 +299,23 @@ test-run,2023-01-01T00:00:00,model.safetensors,prompt,123"""
         runs = config_data['runs']
         assert len(runs) == 1
         assert runs[0]['run_id'] == 'test-run-1'
+    
+    def test_config_json_written_to_disk(self):
+        """Test that create_config_json writes the config as JSON"""
+        config_path = self.generator.create_config_json([_BASE_RUN])
+        
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config_data = json.load(f)
         
-        # Cleanup
-        if os.path.exists(config_path):
-            os.remove(config_path)
+        assert config_data['report_metadata']['total_runs'] == 1
+        assert config_data['runs'][0]['run_id'] == 'test-run-1'
     
     def test_readme_content(self):
         """Test that README.md has correct content"""
-        test_runs = [
-            RunConfig(
-                run_id="test-run-1",
-                timestamp=datetime.now().isoformat(),
-                model="test-model.safetensors",
-                vae=None,
-                loras=[],
-                controlnets=[],
-                prompt="test prompt",
-                negative_prompt="",
-                seed=12345,
-                sampler="euler",
-                steps=20,
-                cfg_scale=7.0,
-                width=512,
-                height=512,
-                batch_size=1,
-                batch_count=1,
-                workflow={},
-                version="1.0.0",
-                generated_images=self.test_images[:1],
-                generation_type="txt2img"
-            )
-        ]
+        test_runs = [_BASE_RUN]
         
         # Create README
-        readme_path = self.generator.create_readme(test_runs, self.test_images[:1])
+        readme_path = self.generator.create_readme(test_runs, _IMG_ONE)
         
         # Verify content
         with open(readme_path, 'r', encoding='utf-8') as f:
@@ -394,7 +331,16 @@ test-run,2023-01-01T00:00:00,model.safetensors,prompt,123"""
         assert 'config.json' in content
         assert 'images/' in content
         assert 'README.md' in content
+    
+    def test_pack_zip_archives_bundle_dir(self, tmp_path):
+        """Test that pack_zip stores bundle files under their relative paths"""
+        bundle_dir = tmp_path / "bundle"
+        (bundle_dir / "images").mkdir(parents=True)
+        (bundle_dir / "README.md").write_text("readme", encoding='utf-8')
+        (bundle_dir / "images" / "test_image_0.png").write_bytes(b"fake image data 0")
+        
+        zip_path = self.generator.pack_zip(str(bundle_dir), str(tmp_path / "out.zip"), zipfile.ZIP_STORED)
         
-        # Cleanup
-        if os.path.exists(readme_path):
-            os.remove(readme_path) 
\ No newline at end of file
+        with zipfile.ZipFile(zip_path, 'r') as zipf:
+            assert set(zipf.namelist()) == {'README.md', 'images/test_image_0.png'}
+            assert zipf.read('images/test_image_0.png') == b"fake image data 0"
@@ -1,31 +1,43 @@
 import pytest
 import json
-import tempfile
-import os
-from datetime import datetime
+from dataclasses import fields
 from run_registry import RunConfig, RunRegistry, create_run_config_from_generation_data
 
+# Timestamp shared by runs whose ordering the tests do not depend on
+_FIXED_TS = "2023-01-01T00:00:00"
+
+# Keys every RunConfig must expose
+REQUIRED_KEYS = frozenset({
+    'run_id', 'timestamp', 'model', 'vae', 'loras', 'controlnets',
+    'prompt', 'negative_prompt', 'seed', 'sampler', 'steps', 'cfg_scale',
+    'width', 'height', 'batch_size', 'batch_count', 'workflow', 'version',
+    'generated_images', 'generation_type'
+})
+
+
+@pytest.fixture(scope="class")
+def shared_registry(tmp_path_factory):
+    """Run registry backed by a temporary JSON file shared across the class"""
+    storage_file = tmp_path_factory.mktemp("registry") / "run_registry.json"
+    return RunRegistry(str(storage_file))
+
+
 class TestRunRegistry:
     """Test cases for the Run Registry functionality"""
     
-    def setup_method(self):
-        """Set up test fixtures"""
-        # Create a temporary file for testing
-        self.temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json')
-        self.temp_file.close()
-        self.registry = RunRegistry(self.temp_file.name)
-    
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        if os.path.exists(self.temp_file.name):
-            os.unlink(self.temp_file.name)
+    @pytest.fixture(autouse=True)
+    def _reset_registry(self, shared_registry):
+        """Start every test from an empty registry on disk"""
+        self.registry = shared_registry
+        self.registry.runs.clear()
+        self.registry.save_runs()
     
     def test_required_keys_exist(self):
         """Test that RunConfig has all required keys"""
         # Create a minimal run config with all required fields
         config = RunConfig(
             run_id="test-run-123",
-            timestamp=datetime.now().isoformat(),
+            timestamp=_FIXED_TS,
             model="test-model.safetensors",
             vae=None,
             loras=[],
@@ -47,15 +59,8 @@ class TestRunRegistry:
         )
         
         # Assert all required keys exist
-        required_keys = [
-            'run_id', 'timestamp', 'model', 'vae', 'loras', 'controlnets',
-            'prompt', 'negative_prompt', 'seed', 'sampler', 'steps', 'cfg_scale',
-            'width', 'height', 'batch_size', 'batch_count', 'workflow', 'version',
-            'generated_images', 'generation_type'
-        ]
-        
-        for key in required_keys:
-            assert hasattr(config, key), f"Missing required key: {key}"
+        missing = REQUIRED_KEYS.difference(f.name for f in fields(config))
+        assert not missing, f"Missing required keys: {sorted(missing)}"
     
     def test_empty_values_handled(self):
         """Test that empty values are handled without crashes"""
@@ -128,23 +133,8 @@ class TestRunRegistry:
         )
         
         # Assert required keys exist
-        assert hasattr(config, 'run_id')
-        assert hasattr(config, 'timestamp')
-        assert hasattr(config, 'model')
-        assert hasattr(config, 'prompt')
-        assert hasattr(config, 'negative_prompt')
-        assert hasattr(config, 'seed')
-        assert hasattr(config, 'sampler')
-        assert hasattr(config, 'steps')
-        assert hasattr(config, 'cfg_scale')
-        assert hasattr(config, 'width')
-        assert hasattr(config, 'height')
-        assert hasattr(config, 'batch_size')
-        assert hasattr(config, 'batch_count')
-        assert hasattr(config, 'workflow')
-        assert hasattr(config, 'version')
-        assert hasattr(config, 'generated_images')
-        assert hasattr(config, 'generation_type')
+        missing = REQUIRED_KEYS.difference(f.name for f in fields(config))
+        assert not missing, f"Missing required keys: {sorted(missing)}"
         
         # Assert values are set correctly
         assert config.prompt == 'test prompt'
@@ -191,7 +181,7 @@ class TestRunRegistry:
         # Create a test run
         config = RunConfig(
             run_id="test-run-123",
-            timestamp=datetime.now().isoformat(),
+            timestamp=_FIXED_TS,
             model="test-model.safetensors",
             vae=None,
             loras=[],
@@ -216,7 +206,7 @@ class TestRunRegistry:
         self.registry.add_run(config)
         
         # Create new registry instance to test loading
-        new_registry = RunRegistry(self.temp_file.name)
+        new_registry = RunRegistry(self.registry.storage_file)
         
         # Should load the saved run
         loaded_run = new_registry.get_run("test-run-123")
@@ -274,8 +264,7 @@ class TestRunRegistry:
             generation_type="img2img"
         )
         
-        self.registry.add_run(config1)
-        self.registry.add_run(config2)
+        self.registry.add_runs([config1, config2])
         
         # Get all runs (should be sorted by timestamp, newest first)
         all_runs = self.registry.get_all_runs()
@@ -287,7 +276,7 @@ class TestRunRegistry:
         """Test deleting a run"""
         config = RunConfig(
             run_id="test-run-to-delete",
-            timestamp=datetime.now().isoformat(),
+            timestamp=_FIXED_TS,
             model="test-model.safetensors",
             vae=None,
             loras=[],
@@ -322,4 +311,35 @@ class TestRunRegistry:
         
         # Try to delete non-existent run
         success = self.registry.delete_run("non-existent-run")
-        assert success is False 
\ No newline at end of file
+        assert success is False 
+    
+    def test_registry_add_runs_persists_all(self):
+        """Test that a batch of runs is persisted to disk"""
+        configs = [
+            create_run_config_from_generation_data({'prompt': f'prompt {i}'}, [], "txt2img")
+            for i in range(3)
+        ]
+        
+        self.registry.add_runs(configs)
+        
+        # A fresh registry should load every run in the batch
+        new_registry = RunRegistry(self.registry.storage_file)
+        assert {run.run_id for run in new_registry.get_all_runs()} == {c.run_id for c in configs}
+    
+    def test_registry_bulk_update_defers_save(self):
+        """Test that bulk_update only writes the registry when the block exits"""
+        configs = [
+            create_run_config_from_generation_data({'prompt': f'prompt {i}'}, [], "img2img")
+            for i in range(2)
+        ]
+        
+        with self.registry.bulk_update():
+            self.registry.add_run(configs[0])
+            self.registry.add_run(configs[1])
+            self.registry.delete_run(configs[0].run_id)
+            
+            # Nothing has been written to disk yet
+            assert RunRegistry(self.registry.storage_file).get_all_runs() == []
+        
+        loaded_runs = RunRegistry(self.registry.storage_file).get_all_runs()
+        assert [run.run_id for run in loaded_runs] == [configs[1].run_id]